@@ -5,12 +5,18 @@ This module provides functions for ingesting data into the Maji Ndogo farm surve
 It includes functions for creating a database engine, querying data from the database, and reading CSV files from web URLs.
 
 Functions:
-    - create_db_engine(db_path): Creates a SQLAlchemy engine for the specified database path.
-    - query_data(engine, sql_query): Executes a SQL query on the given database engine and returns the result as a Dataframe.
-    - read_from_web_CSV(URL): Reads a CSV file form a web URL and returns the data as DataFrame.
+    - create_db_engine(db_path, validate=False): Creates a SQLAlchemy engine for the specified database path.
+    - query_data(engine, sql_query, dtype=None, chunksize=None, use_connectorx=False): Executes a SQL query on the given database engine and returns the result as a Dataframe.
+    - read_from_web_CSV(URL, **read_csv_kwargs): Reads a CSV file form a web URL and returns the data as DataFrame.
 
 Module-level Variables:
     -logger: A logger named 'data_ingestion' to handle module-specific logs.
+    -LOG_LEVELS: The logging_level names accepted by the processor classes, mapped to logging levels.
+    -CSV_ENGINE: 'pyarrow' when pyarrow is installed, otherwise None. Callers with a known schema can pass it as
+     engine=CSV_ENGINE; pyarrow names blank headers '' and parses ISO dates, unlike the default parser.
+    -connectorx: The connectorx module when installed, used for opt-in columnar SQLite reads; otherwise None.
+    -CSV_CACHE_DIR: Directory where downloaded CSV files and their HTTP validators are cached.
+    -CSV_CACHE_TTL: Seconds a cached CSV is trusted before the server is asked whether it changed.
     -db_path: The path to the Maji Ndogo farm survey SQLite database.
     -sql_query: The SQL query to fetch data from various tables in the database.
     -weather_data_URL: URL for the weather station data CSV file.
@@ -32,20 +38,58 @@ Example:
 """
 
 from sqlalchemy import create_engine, text
+import functools
+import hashlib
+import json
 import logging
+import os
+import tempfile
+import time
+import urllib.error
+import urllib.request
 import pandas as pd
+# pyarrow's multi-threaded CSV parser, for callers that opt in with engine=CSV_ENGINE; None is pandas' default
+try:
+    import pyarrow  # noqa: F401
+    CSV_ENGINE = "pyarrow"
+except ImportError:
+    CSV_ENGINE = None
+# connectorx reads SQLite results straight into Arrow buffers, skipping the DB-API row-by-row fetch
+try:
+    import connectorx
+except ImportError:
+    connectorx = None
 # Name our logger so we know that logs from this module come from the data_ingestion module
 logger = logging.getLogger('data_ingestion')
-# Set a basic logging message up that prints out a timestamp, the name of our logger, and the message
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+# Handlers and formatting are left to the application, e.g. logging.basicConfig(level=logging.INFO)
+# Maps the logging_level names accepted by the processors to logging levels; "NONE" sits above CRITICAL
+# so isEnabledFor() rejects every record
+LOG_LEVELS = {
+    "DEBUG": logging.DEBUG,
+    "INFO": logging.INFO,
+    "WARNING": logging.WARNING,
+    "ERROR": logging.ERROR,
+    "NONE": logging.CRITICAL + 1,
+}
+# Downloaded CSVs are kept here so re-running the pipeline does not fetch unchanged files again
+CSV_CACHE_DIR = os.path.join(tempfile.gettempdir(), "maji_ndogo_csv_cache")
+CSV_CACHE_TTL = 3600
 
 
-def create_db_engine(db_path):
+@functools.lru_cache(maxsize=None)
+def _create_cached_engine(db_path):
+    # One engine (and connection pool) per database path, shared by every caller
+    return create_engine(db_path)
+
+def create_db_engine(db_path, validate=False):
     """
     Creates a SQLAlchemy engine for the specified database path.
+    Engines are memoized per path, so repeated calls share one engine and its connection pool.
+    The engine connects lazily; connection errors surface on the first query unless validate is True.
     
     Args:
         db_path (str): The path to the SQLite database.
+        validate (bool): Open and close a connection to check the database is reachable (default is False).
         
     Returns:
         engine(sqlalchemy.engine.Engine): The SQLAlchemy engine object.
@@ -56,27 +100,35 @@ def create_db_engine(db_path):
         
     """
     try:
-        engine = create_engine(db_path)
-        # Test connection
-        with engine.connect() as conn:
-            pass
-        # test if the database engine was created successfully
+        engine = _create_cached_engine(db_path)
+        if validate:
+            # Test connection
+            with engine.connect():
+                pass
         logger.info("Database engine created successfully.")
         return engine # Return the engine object if it all works well
-    except ImportError: #If we get an ImportError, inform the user SQLAlchemy is not installed
+    except ImportError as e: #If we get an ImportError, inform the user SQLAlchemy is not installed
         logger.error("SQLAlchemy is required to use this function. Please install it first.")
         raise e
     except Exception as e:# If we fail to create an engine inform the user
-        logger.error(f"Failed to create database engine. Error: {e}")
+        logger.error("Failed to create database engine. Error: %s", e)
         raise e
     
-def query_data(engine, sql_query):
+def query_data(engine, sql_query, dtype=None, chunksize=None, use_connectorx=False):
     """
     Executes a SQL query on the given database engine and returns the result as a DataFrame.
+
+    With use_connectorx=True, file-backed SQLite databases are read through connectorx (when installed and
+    no chunksize is given). Its dtypes can differ from pd.read_sql_query: DATETIME columns come back as
+    datetime64 and BOOLEAN as bool. If connectorx fails, e.g. on text stored in an INTEGER column, the
+    query falls back to the SQLAlchemy path.
     
     Args:
         engine(sqlalchemy.engine.Engine): The SQLAlchemy engine object.
         sql_query(str): The SQL query to execute.
+        dtype(dict): Optional mapping of column names to dtypes, applied as each batch is read.
+        chunksize(int): Optional number of rows to fetch per batch. Batches are concatenated into one DataFrame.
+        use_connectorx(bool): Try connectorx's columnar reader for SQLite files first (default is False).
         
     Returns:
         df (Dataframe): The result of the SQL query as a DataFrame.
@@ -87,8 +139,25 @@ def query_data(engine, sql_query):
         
     """
     try:
-        with engine.connect() as connection:
-            df = pd.read_sql_query(text(sql_query), connection)
+        df = None
+        database = engine.url.database
+        if use_connectorx and connectorx is None:
+            logger.warning("connectorx is not installed, reading the query through SQLAlchemy.")
+        elif use_connectorx and chunksize is None and engine.dialect.name == "sqlite" and database not in (None, "", ":memory:"):
+            try:
+                # connectorx expects sqlite:// followed by an absolute path
+                table = connectorx.read_sql("sqlite://" + os.path.abspath(database), sql_query, return_type="arrow")
+                df = table.to_pandas()
+                if dtype:
+                    df = df.astype(dtype)
+            except Exception as e:
+                logger.warning("connectorx could not read the query, falling back to SQLAlchemy. Error: %s", e)
+                df = None
+        if df is None:
+            with engine.connect() as connection:
+                result = pd.read_sql_query(text(sql_query), connection, dtype=dtype, chunksize=chunksize)
+                # With a chunksize pandas yields DataFrames, so stitch the batches back together
+                df = pd.concat(result, ignore_index=True) if chunksize else result
         if df.empty:
             # Log a message or handle the empty DataFrame scenario as needed
             msg = "The query returned an empty DataFrame."
@@ -97,18 +166,81 @@ def query_data(engine, sql_query):
         logger.info("Query executed successfully.")
         return df
     except ValueError as e: 
-        logger.error(f"SQL query failed. Error: {e}")
+        logger.error("SQL query failed. Error: %s", e)
         raise e
     except Exception as e:
-        logger.error(f"An error occurred while querying the database. Error: {e}")
+        logger.error("An error occurred while querying the database. Error: %s", e)
         raise e
     
-def read_from_web_CSV(URL):
+def _write_cache_file(path, data):
+    """
+    Writes bytes to a cache file atomically, so concurrent readers never see a partially written file.
+    """
+    os.makedirs(CSV_CACHE_DIR, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=CSV_CACHE_DIR, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+def _fetch_cached_CSV(URL):
+    """
+    Downloads a CSV file into the local cache and returns the path of the cached copy.
+
+    A cached copy younger than CSV_CACHE_TTL is used without touching the network. Older copies are
+    revalidated with If-None-Match / If-Modified-Since, so an unchanged file costs a 304 instead of a download.
+    """
+    key = hashlib.sha256(URL.encode("utf-8")).hexdigest()
+    body_path = os.path.join(CSV_CACHE_DIR, key + ".csv")
+    meta_path = os.path.join(CSV_CACHE_DIR, key + ".json")
+
+    meta = {}
+    if os.path.exists(body_path) and os.path.exists(meta_path):
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+        except ValueError:
+            meta = None
+        if not isinstance(meta, dict):
+            # Corrupt metadata, or valid JSON that is not an object, is treated as a cache miss and overwritten below
+            logger.warning("Ignoring unreadable CSV cache metadata: %s", meta_path)
+            meta = {}
+        if time.time() - meta.get("fetched_at", 0) < CSV_CACHE_TTL:
+            logger.info("Using cached copy of CSV file.")
+            return body_path
+
+    request = urllib.request.Request(URL)
+    if meta.get("etag"):
+        request.add_header("If-None-Match", meta["etag"])
+    if meta.get("last_modified"):
+        request.add_header("If-Modified-Since", meta["last_modified"])
+
+    try:
+        with urllib.request.urlopen(request) as response:
+            body = response.read()
+            meta = {"etag": response.headers.get("ETag"), "last_modified": response.headers.get("Last-Modified")}
+        _write_cache_file(body_path, body)
+    except urllib.error.HTTPError as e:
+        if e.code != 304:
+            raise
+        # The server confirmed our copy is current, so only refresh its timestamp
+        logger.info("CSV file not modified since last download, using cached copy.")
+
+    meta["fetched_at"] = time.time()
+    _write_cache_file(meta_path, json.dumps(meta).encode("utf-8"))
+    return body_path
+
+def read_from_web_CSV(URL, **read_csv_kwargs):
     """
     Reads a CSV file from a web URL and returns the data as a Dataframe.
+    HTTP(S) downloads are cached on disk, see CSV_CACHE_DIR and CSV_CACHE_TTL.
     
     Args:
         URL (str): The URL of the CSV file.
+        **read_csv_kwargs: Extra keyword arguments passed on to pd.read_csv, e.g. index_col=0 or engine=CSV_ENGINE.
         
     Returns:
         df (pandas.DataFrame): The data from the CSV file as a DataFrame.
@@ -119,12 +251,14 @@ def read_from_web_CSV(URL):
         
     """
     try:
-        df = pd.read_csv(URL)
+        if URL.startswith(("http://", "https://")):
+            URL = _fetch_cached_CSV(URL)
+        df = pd.read_csv(URL, **read_csv_kwargs)
         logger.info("CSV file read successfully from the web.")
         return df
     except pd.errors.EmptyDataError as e:
         logger.error("The URL does not point to a valid CSV file. Please check the URL and try again.")
         raise e
     except Exception as e:
-        logger.error(f"Failed to read CSV from the web. Error: {e}")
+        logger.error("Failed to read CSV from the web. Error: %s", e)
         raise e
\ No newline at end of file
@@ -1,5 +1,10 @@
+import asyncio
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+import os
+import numpy as np
 import pandas as pd
-from data_ingestion import create_db_engine, query_data, read_from_web_CSV
+from data_ingestion import CSV_ENGINE, LOG_LEVELS, create_db_engine, query_data, read_from_web_CSV
 import logging
 
 class FieldDataProcessor:
@@ -13,17 +18,27 @@ class FieldDataProcessor:
     - columns_to_rename (dict): A dictionary specifying columns to be renamed.
     - values_to_rename (dict): A dictionary specifying values to be renamed.
     - weather_map_data (str): The URL for weather station mapping data.
+    - column_dtypes (dict): Optional dtypes to apply to the SQL columns on ingest.
+    - float_dtype (str): Optional float dtype that float64 SQL columns are downcast to on ingest.
+    - cache_dir (str): Optional directory where the ingested DataFrame is cached as a Parquet file.
+    - use_connectorx (bool): Whether query_data may read SQLite results through connectorx.
+    - values_to_rename_keys (pd.Index): The values_to_rename keys, indexed once for lookups.
+    - values_to_rename_values (np.ndarray): The values_to_rename replacements, aligned with values_to_rename_keys.
     - logger (logging.Logger): The logger for recording log messages.
     - df (pd.DataFrame): The DataFrame to store the processed data.
     - engine (sqlalchemy.engine.Engine): The SQLAlchemy engine for database interaction.
 
     Methods:
     - initialize_logging(logging_level): Set up logging for the instance.
+    - stage_cache_path(stage, *key_parts): Path of the Parquet cache file for a pipeline stage.
     - ingest_sql_data(): Ingest data from the SQL database.
     - rename_columns(): Rename specified columns in the DataFrame.
     - apply_corrections(column_name='Crop_type', abs_column='Elevation'): Apply corrections to DataFrame columns.
-    - weather_station_mapping(): Map weather station data to the DataFrame.
+    - read_weather_map(): Read the weather station mapping CSV.
+    - weather_station_mapping(weather_map_df=None): Map weather station data to the DataFrame.
     - process(): Perform the complete data processing pipeline.
+    - process_async(): Perform the pipeline in a worker thread, for use from an event loop.
+    - process_lazy(column_name='Crop_type', abs_column='Elevation'): Perform the pipeline as a single Polars lazy query.
     """
 
     def __init__(self, config_params, logging_level="INFO"):
@@ -38,6 +53,11 @@ class FieldDataProcessor:
             - 'columns_to_rename' (dict): A dictionary specifying columns to be renamed.
             - 'values_to_rename' (dict): A dictionary specifying values to be renamed.
             - 'weather_mapping_csv' (str): The URL for weather station mapping data.
+            - 'column_dtypes' (dict, optional): Dtypes to apply to the SQL columns as they are read.
+            - 'float_dtype' (str, optional): A narrower float dtype, e.g. 'float32', for float64 SQL columns
+              not listed in 'column_dtypes'.
+            - 'cache_dir' (str, optional): Directory for Parquet copies of the ingested data.
+            - 'use_connectorx' (bool, optional): Read SQLite results through connectorx (default is False).
             - logging_level (str): The desired logging level (default is "INFO").
         """
         
@@ -46,6 +66,13 @@ class FieldDataProcessor:
         self.columns_to_rename = config_params["columns_to_rename"]
         self.values_to_rename = config_params["values_to_rename"]
         self.weather_map_data = config_params["weather_mapping_csv"]
+        self.column_dtypes = config_params.get("column_dtypes")
+        self.float_dtype = config_params.get("float_dtype")
+        self.cache_dir = config_params.get("cache_dir")
+        self.use_connectorx = config_params.get("use_connectorx", False)
+        # values_to_rename never changes, so build its hash index once instead of on every correction
+        self.values_to_rename_keys = pd.Index(list(self.values_to_rename.keys()))
+        self.values_to_rename_values = np.array(list(self.values_to_rename.values()), dtype=object)
 
         
         self.initialize_logging(logging_level)
@@ -63,18 +90,12 @@ class FieldDataProcessor:
         self.logger = logging.getLogger(logger_name)
         self.logger.propagate = False  # Prevents log messages from being propagated to the root logger
 
-        # Set logging level
-        if logging_level.upper() == "DEBUG":
-            log_level = logging.DEBUG
-        elif logging_level.upper() == "INFO":
-            log_level = logging.INFO
-        elif logging_level.upper() == "NONE":  # Option to disable logging
+        # Set logging level, defaulting to INFO for unknown names
+        log_level = LOG_LEVELS.get(logging_level.upper(), logging.INFO)
+        self.logger.setLevel(log_level)
+        if log_level > logging.CRITICAL:  # Option to disable logging
             self.logger.disabled = True
             return
-        else:
-            log_level = logging.INFO  # Default to INFO
-
-        self.logger.setLevel(log_level)
 
         # Only add handler if not already added to avoid duplicate messages
         if not self.logger.handlers:
@@ -86,9 +107,29 @@ class FieldDataProcessor:
         # Use self.logger.info(), self.logger.debug(), etc.
 
 
+    def stage_cache_path(self, stage, *key_parts):
+        """
+        Return the Parquet cache file for a pipeline stage, or None if caching is disabled.
+
+        Args:
+        - stage (str): The name of the pipeline stage, used as the file name prefix.
+        - key_parts: Values the stage's output depends on; any change to them gives a new file.
+
+        Returns:
+        - str: The path of the cache file, or None when no cache_dir is configured.
+
+        """
+        if self.cache_dir is None:
+            return None
+        key = hashlib.sha256(repr(key_parts).encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"{stage}_cache_{key}.parquet")
+
     def ingest_sql_data(self):
         """
         Ingest data from the SQL database and store it in the DataFrame.
+        When a cache_dir is configured and the database is a local file, the result is reused from
+        Parquet until the query, dtypes, or database file change. Other databases are never cached,
+        since there is no modification time to invalidate the cache with.
 
         Returns:
         - pd.DataFrame: The DataFrame containing the ingested data.
@@ -98,17 +139,51 @@ class FieldDataProcessor:
         if self.engine is None:
             self.engine = create_db_engine(self.db_path)
             self.logger.info("Database engine created successfully.")
-            
+
+        # A file-backed database's modification time invalidates the cache when its contents change
+        cache_path = None
+        database = self.engine.url.database
+        if database and os.path.isfile(database):
+            cache_path = self.stage_cache_path(
+                "ingest",
+                self.db_path,
+                self.sql_query,
+                self.column_dtypes,
+                self.float_dtype,
+                self.use_connectorx,
+                os.path.getmtime(database),
+            )
+        if cache_path is not None and os.path.exists(cache_path):
+            self.df = pd.read_parquet(cache_path)
+            self.logger.info("Loaded ingested data from cache.")
+            return self.df
+
         try:
             # Query the data from the database using the created engine
-            self.df = query_data(self.engine, self.sql_query)
+            self.df = query_data(self.engine, self.sql_query, dtype=self.column_dtypes, use_connectorx=self.use_connectorx)
+            if self.float_dtype is not None:
+                # Halves the memory of every measurement column, at the cost of float32 precision.
+                # Columns pinned in column_dtypes keep their explicit dtype.
+                pinned_columns = self.column_dtypes or {}
+                float_columns = [
+                    column for column in self.df.select_dtypes(include="float64").columns if column not in pinned_columns
+                ]
+                self.df = self.df.astype({column: self.float_dtype for column in float_columns})
             self.logger.info("Successfully loaded data.")
             
         except Exception as e:
             # Log an error message if theres's an issue with querying the data
-            self.logger.error(f"Failed to load data. Error: {e}")
+            self.logger.error("Failed to load data. Error: %s", e)
             
             raise e
+
+        if cache_path is not None:
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                self.df.to_parquet(cache_path)
+            except Exception as e:
+                # The data loaded fine, so a cache that cannot be written (e.g. duplicate column names) is not fatal
+                self.logger.warning("Could not cache ingested data. Error: %s", e)
             
         return self.df
     
@@ -119,19 +194,12 @@ class FieldDataProcessor:
 
         """
         # Extract the columns to rename from the configuration
-        column1, column2 = list(self.columns_to_rename.keys())[0], list(self.columns_to_rename.values())[0]       
+        column1, column2 = next(iter(self.columns_to_rename.items()))
 
-        # Temporarily rename one of the columns to avoid a naming conflict
-        temp_name = "__temp_name_for_swap__"
-        while temp_name in self.df.columns:
-            temp_name += "_"
-            
-        
-        # Perform the swap
-        self.df = self.df.rename(columns={column1: temp_name, column2: column1})
-        self.df = self.df.rename(columns={temp_name: column2})
+        # rename applies the whole mapping in one pass over the columns, so the swap needs no temporary name
+        self.df = self.df.rename(columns={column1: column2, column2: column1})
         
-        self.logger.info(f"Swapped columns: {column1} with {column2}")
+        self.logger.info("Swapped columns: %s with %s", column1, column2)
         
     
     def apply_corrections(self, column_name='Crop_type', abs_column='Elevation'):
@@ -142,32 +210,148 @@ class FieldDataProcessor:
         - column_name (str): The name of the column to apply corrections to (default is 'Crop_type').
         - abs_column (str): The name of the column to take the absolute value of (default is 'Elevation').
 
+        The corrected columns are assigned as new arrays, so a DataFrame that self.df was sliced from is
+        never modified. The corrected column_name is stored as a pandas Categorical.
+
+        """
+        if isinstance(self.df[abs_column].dtype, np.dtype):
+            # np.abs on the raw array skips the Series wrapper and writes a new array, so frames that
+            # self.df is a view of (e.g. df.iloc[...] slices) are left untouched
+            self.df[abs_column] = np.abs(self.df[abs_column].to_numpy())
+        else:
+            # Series.abs keeps extension dtypes such as Int64 or double[pyarrow]
+            self.df[abs_column] = self.df[abs_column].abs()
+        # Crop names repeat heavily, so rename and strip only the unique values and store the column as a
+        # Categorical: the rows keep integer codes and only the small categories array holds strings
+        codes, uniques = pd.factorize(self.df[column_name])
+        corrected = pd.Series(uniques, dtype=object)
+        positions = self.values_to_rename_keys.get_indexer(corrected)
+        renamed = positions >= 0
+        corrected[renamed] = self.values_to_rename_values[positions[renamed]]
+        corrected = corrected.str.strip()
+        # A corrected name can collide with an existing one (e.g. 'cassaval' -> 'cassava'), so factorize again
+        category_codes, categories = pd.factorize(corrected)
+        # The appended -1 keeps missing values (code -1) missing
+        codes = np.append(category_codes, -1)[codes]
+        self.df[column_name] = pd.Categorical.from_codes(codes, categories)
+
+    def read_weather_map(self):
         """
-        self.df[abs_column] = self.df[abs_column].abs()
-        self.df[column_name] = self.df[column_name].apply(lambda crop: self.values_to_rename.get(crop, crop))
-        self.df[column_name] = self.df[column_name].str.strip()
+        Read the weather station mapping CSV.
+
+        The file was written with its RangeIndex, so that column is loaded as the index instead of
+        being read as 'Unnamed: 0' and dropped afterwards. Its schema (Field_ID, Weather_station) is
+        known, so pyarrow's multi-threaded parser is used when it is installed.
+
+        Returns:
+        - pd.DataFrame: The weather station mapping data.
 
-    def weather_station_mapping(self):
+        """
+        return read_from_web_CSV(self.weather_map_data, index_col=0, engine=CSV_ENGINE)
+
+    def weather_station_mapping(self, weather_map_df=None):
         """
         Map weather station data to the DataFrame.
 
+        Args:
+        - weather_map_df (pd.DataFrame): An already fetched weather station mapping (default is None,
+          in which case it is read with read_weather_map()).
+
         Returns:
         - pd.DataFrame: The DataFrame with weather station data mapped.
 
         """
-        self.df = self.df.merge(read_from_web_CSV(self.weather_map_data))
+        if weather_map_df is None:
+            weather_map_df = self.read_weather_map()
+
+        key_columns = [column for column in weather_map_df.columns if column in self.df.columns]
+        value_columns = [column for column in weather_map_df.columns if column not in key_columns]
+        if len(key_columns) == 1 and len(value_columns) == 1 and weather_map_df[key_columns[0]].is_unique:
+            # One unique key and one value column: a single hash lookup per row is much cheaper than a merge.
+            # Unmatched rows are dropped, so the rows, order and columns match an inner DataFrame.merge.
+            lookup = weather_map_df.set_index(key_columns[0])[value_columns[0]]
+            positions = lookup.index.get_indexer(self.df[key_columns[0]])
+            matched = positions >= 0
+            self.df = self.df[matched].reset_index(drop=True)
+            self.df[value_columns[0]] = lookup.to_numpy()[positions[matched]]
+        else:
+            self.df = self.df.merge(weather_map_df)
         return self.df
 
     def process(self):
         """
         Perform the complete data processing pipeline.
 
-        This method sequentially calls the ingest, rename, correction, and mapping methods.
+        The SQL ingest and the weather station mapping download run on two threads, since both spend
+        their time waiting on I/O. The rename, correction, and mapping methods then run in order.
         """
-        self.ingest_sql_data()
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            sql_future = executor.submit(self.ingest_sql_data)
+            csv_future = executor.submit(self.read_weather_map)
+            sql_future.result()
+            weather_map_df = csv_future.result()
+
         self.rename_columns()
         self.apply_corrections()
-        self.weather_station_mapping()
-        self.df = self.df.drop(columns="Unnamed: 0")
+        self.weather_station_mapping(weather_map_df)
+
+        self.logger.info("Data processing completed successfully.")
+
+    async def process_async(self):
+        """
+        Perform the complete data processing pipeline without blocking the event loop.
 
-        self.logger.info("Data processing completed successfully.")
\ No newline at end of file
+        Runs process() in a worker thread, where the SQL ingest and the CSV download already overlap.
+        Await this from an existing event loop (e.g. Jupyter).
+        """
+        await asyncio.to_thread(self.process)
+
+    def process_lazy(self, column_name='Crop_type', abs_column='Elevation'):
+        """
+        Perform the complete data processing pipeline as one Polars lazy query.
+
+        The rename, corrections, and weather station join are planned together and executed in a
+        single collect, so no intermediate DataFrame is materialised between the stages. The result
+        is stored in self.df as a pandas DataFrame with column_name as a Categorical, like process().
+        Unlike process(), the column_dtypes and float_dtype settings and the Parquet cache are not applied.
+
+        Args:
+        - column_name (str): The name of the column to apply corrections to (default is 'Crop_type').
+        - abs_column (str): The name of the column to take the absolute value of (default is 'Elevation').
+
+        Raises:
+        - ImportError: If Polars is not installed.
+        """
+        try:
+            import polars as pl
+        except ImportError as e:
+            self.logger.error("Polars is required to use process_lazy. Please install it first.")
+            raise e
+
+        if self.engine is None:
+            self.engine = create_db_engine(self.db_path)
+            self.logger.info("Database engine created successfully.")
+
+        with self.engine.connect() as connection:
+            field_df = pl.read_database(self.sql_query, connection)
+        weather_map_df = pl.from_pandas(self.read_weather_map())
+        # Join on the shared columns, like DataFrame.merge does by default
+        join_columns = [column for column in weather_map_df.columns if column in field_df.columns]
+        # Swap the first configured pair, the same way rename_columns does
+        column1, column2 = next(iter(self.columns_to_rename.items()))
+
+        self.df = (
+            field_df.lazy()
+            .rename({column1: column2, column2: column1})
+            .with_columns(
+                pl.col(abs_column).abs(),
+                pl.col(column_name).replace(self.values_to_rename).str.strip_chars(),
+            )
+            .join(weather_map_df.lazy(), on=join_columns, how="inner")
+            .collect()
+            .to_pandas()
+        )
+        self.df[column_name] = self.df[column_name].astype("category")
+
+        self.logger.info("Data processing completed successfully.")
+        return self.df
@@ -3,7 +3,7 @@ import re
 import numpy as np
 import pandas as pd
 import logging
-from data_ingestion import read_from_web_CSV
+from data_ingestion import LOG_LEVELS, read_from_web_CSV
 
 
 class WeatherDataProcessor:
@@ -18,18 +18,12 @@ class WeatherDataProcessor:
         self.logger = logging.getLogger(logger_name)
         self.logger.propagate = False  # Prevents log messages from being propagated to the root logger
 
-        # Set logging level
-        if logging_level.upper() == "DEBUG":
-            log_level = logging.DEBUG
-        elif logging_level.upper() == "INFO":
-            log_level = logging.INFO
-        elif logging_level.upper() == "NONE":  # Option to disable logging
+        # Set logging level, defaulting to INFO for unknown names
+        log_level = LOG_LEVELS.get(logging_level.upper(), logging.INFO)
+        self.logger.setLevel(log_level)
+        if log_level > logging.CRITICAL:  # Option to disable logging
             self.logger.disabled = True
             return
-        else:
-            log_level = logging.INFO  # Default to INFO
-
-        self.logger.setLevel(log_level)
 
         # Only add handler if not already added to avoid duplicate messages
         if not self.logger.handlers:
@@ -48,7 +42,7 @@ class WeatherDataProcessor:
         for key, pattern in self.patterns.items():
             match = re.search(pattern, message)
             if match:
-                self.logger.debug(f"Measurement extracted: {key}")
+                self.logger.debug("Measurement extracted: %s", key)
                 return key, float(next((x for x in match.groups() if x is not None)))
         self.logger.debug("No measurement match found.")
         return None, None